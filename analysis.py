@@ -0,0 +1,206 @@
+# analysis.py
+#
+# Reine Berechnungs- und Plot-Funktionen ohne Streamlit-Aufrufe.
+# Werden von app_local_csv.py und dem Report-Renderer (report.py) genutzt und
+# koennen auch aus Hintergrund-Threads (Prefetch) aufgerufen werden.
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# --- DATEN LADEN ---
+def read_measurements(path):
+    df = pd.read_csv(path)
+    if 'datum' in df.columns:
+        df['datum'] = pd.to_datetime(df['datum'])
+    return df
+
+
+# --- KLIMA: INNEN- VS. AUSSENTEMPERATUR ---
+def compute_temperaturvergleich(df_klima, haus=None):
+    if haus is not None:
+        df_klima = df_klima[df_klima['haus'] == haus]
+    return df_klima.set_index('datum')[['gh_gem_tagesdurchschnitt_c', 'aussen_durchschnittstemp_c']]
+
+
+def build_temperatur_figure(temp_vergleich, title=None):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=temp_vergleich.index,
+        y=temp_vergleich['gh_gem_tagesdurchschnitt_c'],
+        mode='lines',
+        name='Innen'
+    ))
+    fig.add_trace(go.Scatter(
+        x=temp_vergleich.index,
+        y=temp_vergleich['aussen_durchschnittstemp_c'],
+        mode='lines',
+        name='Aussen'
+    ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Datum",
+        yaxis_title="Temperatur in Grad Celsius"
+    )
+    return fig
+
+
+# --- WACHSTUMSMOTOR: STRAHLUNG VS. LAENGENZUWACHS ---
+def compute_wachstumsmotor(df_klima, df_wachstum, haus):
+    # Filtere Klima- und Wachstumsdaten für das gewählte Haus
+    df_klima_haus = df_klima[df_klima['haus'] == haus]
+    df_wachstum_haus = df_wachstum[df_wachstum['haus'] == haus]
+
+    # Durchschnittliche wöchentliche Strahlungssumme und Längenzuwachs
+    strahlung_pro_woche = df_klima_haus.groupby('woche')['aussen_strahlungssumme_j_cm2'].mean().reset_index()
+    wachstum_pro_woche = df_wachstum_haus.groupby('woche')['laengenzuwachs_cm_woche'].mean().reset_index()
+
+    # Zusammenführen und chronologisch sortieren
+    merged_df = pd.merge(strahlung_pro_woche, wachstum_pro_woche, on='woche')
+    return merged_df.sort_values('woche')
+
+
+def build_wachstumsmotor_figure(merged_df, kultur, haus):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=merged_df['woche'],
+        y=merged_df['aussen_strahlungssumme_j_cm2'],
+        mode='lines+markers',
+        name='Strahlungssumme (J/cm²)'
+    ))
+    fig.add_trace(go.Scatter(
+        x=merged_df['woche'],
+        y=merged_df['laengenzuwachs_cm_woche'],
+        mode='lines+markers',
+        name='Längenzuwachs (cm/Woche)',
+        yaxis='y2'
+    ))
+    fig.update_layout(
+        title=f"Strahlung und Längenzuwachs pro Woche ({kultur}, Haus {haus})",
+        xaxis_title="Woche",
+        yaxis=dict(
+            title="Strahlungssumme (J/cm²)",
+            side="left"
+        ),
+        yaxis2=dict(
+            title="Längenzuwachs (cm/Woche)",
+            overlaying="y",
+            side="right"
+        ),
+        legend=dict(x=0.01, y=0.99)
+    )
+    return fig
+
+
+# --- LAI VS. FRUCHTANSATZ ---
+def compute_lai_fruchtansatz(df_wachstum, df_produktion, pflanzen_ids):
+    # Durchschnittlicher LAI und Fruchtansatz pro Woche für die gegebenen Pflanzen
+    wachstum_kultur = df_wachstum[df_wachstum['pflanze_id'].isin(pflanzen_ids)]
+    produktion_kultur = df_produktion[df_produktion['pflanze_id'].isin(pflanzen_ids)]
+    lai_pro_woche = wachstum_kultur.groupby('woche')['lai_m2_m2'].mean().reset_index()
+    fruchtansatz_pro_woche = produktion_kultur.groupby('woche')['fruchtansatz_x_m2'].mean().reset_index()
+    return pd.merge(lai_pro_woche, fruchtansatz_pro_woche, on='woche')
+
+
+def build_lai_fruchtansatz_figure(lai_fruchtansatz, label):
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=lai_fruchtansatz['woche'],
+        y=lai_fruchtansatz['lai_m2_m2'],
+        mode='lines+markers',
+        name='LAI (m²/m²)',
+    ))
+    fig.add_trace(go.Scatter(
+        x=lai_fruchtansatz['woche'],
+        y=lai_fruchtansatz['fruchtansatz_x_m2'],
+        mode='lines+markers',
+        name='Fruchtansatz',
+        yaxis='y2'
+    ))
+    fig.update_layout(
+        title=f"LAI und Fruchtansatz pro Woche ({label})",
+        xaxis_title="Woche",
+        yaxis=dict(
+            title="LAI",
+            side="left"
+        ),
+        yaxis2=dict(
+            title="Fruchtansatz_pro_m2",
+            overlaying="y",
+            side="right"
+        ),
+        legend=dict(x=0.01, y=0.99)
+    )
+    return fig
+
+
+# --- SORTENVERGLEICH ---
+def compute_sortenvergleich(df_produktion, df_pflanzen, kultur):
+    # Filtere Pflanzen-Stammdaten und Produktionsdaten für die gewählte Kultur
+    pflanzen_kultur = df_pflanzen[df_pflanzen['kultur'] == kultur]
+    pflanzen_ids = pflanzen_kultur['pflanze_id'].unique()
+    produktion_kultur = df_produktion[df_produktion['pflanze_id'].isin(pflanzen_ids)]
+
+    # Durchschnittliche Produktion pro Sorte
+    sorten_df = pd.merge(produktion_kultur, pflanzen_kultur, on='pflanze_id')
+    return sorten_df.groupby('sorte')['produktion_x_m2'].mean().sort_values(ascending=False)
+
+
+def build_sortenvergleich_figure(produktion_pro_sorte):
+    # px.bar kann keine leere Serie darstellen (z.B. Kultur ohne Ernte-Daten)
+    if produktion_pro_sorte.empty:
+        fig = go.Figure(go.Bar(x=[], y=[]))
+        fig.update_layout(title="Durchschnittliche Produktion pro Sorte", xaxis_title="Sorte")
+        fig.update_yaxes(title_text="Produktion pro m²")
+        return fig
+
+    fig = px.bar(
+        produktion_pro_sorte,
+        x=produktion_pro_sorte.index,
+        y=produktion_pro_sorte.values,
+        labels={'x': 'Sorte', 'y': 'Produktion pro m²'},
+        title="Durchschnittliche Produktion pro Sorte"
+    )
+    fig.update_yaxes(title_text="Produktion pro m²")
+    return fig
+
+
+# --- VERGLEICHSMATRIX: WOCHE × HAUS/SORTE ---
+def build_matrix_figure(matrix, column, axis_label):
+    # Eine einzige Heatmap-Trace statt einer Linie pro Haus/Sorte
+    fig = go.Figure(go.Heatmap(
+        z=matrix.T.to_numpy(),
+        x=matrix.index,
+        y=[str(c) for c in matrix.columns],
+        colorscale='Viridis',
+        colorbar=dict(title=column),
+        hovertemplate=f"Woche %{{x}}<br>{axis_label} %{{y}}<br>{column}: %{{z:.2f}}<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"{column} pro Woche und {axis_label}",
+        xaxis_title="Woche",
+        yaxis_title=axis_label,
+        yaxis=dict(type='category'),
+        height=max(300, 40 * len(matrix.columns) + 150)
+    )
+    return fig
+
+
+# --- TRUSS-ANALYSE: BLÜTE BIS ERNTE ---
+def compute_bluete_bis_ernte(truss_store, df_pflanzen, kultur):
+    pflanzen_kultur = df_pflanzen[df_pflanzen['kultur'] == kultur]
+    return pd.merge(truss_store.blossom_to_harvest(), pflanzen_kultur[['pflanze_id', 'haus', 'sorte']], on='pflanze_id')
+
+
+def build_bluete_bis_ernte_figure(bluete_bis_ernte, kultur):
+    fig = px.box(
+        bluete_bis_ernte,
+        x='sorte',
+        y='tage_bis_ernte',
+        points='all',
+        hover_data=['haus', 'pflanze_id', 'truss_nr'],
+        labels={'sorte': 'Sorte', 'tage_bis_ernte': 'Tage von Blüte bis Ernte'},
+        title=f"Blüte bis Ernte pro Truss ({kultur})"
+    )
+    return fig
@@ -0,0 +1,106 @@
+# anomalies.py
+#
+# Erkennung von Auffälligkeiten in den Klima-Messungen (Rohrtemperatur, CO2,
+# Feuchte) für alle Häuser und Spalten in einem vektorisierten Durchlauf.
+#
+# Baseline ist der gleitende Median der vorherigen `window` Tage des Hauses
+# (folgt damit dem saisonalen Verlauf), die Streuung der gleitende
+# Interquartilsabstand. Ein Wert ist auffällig, wenn sein robuster z-Wert
+# (wert - median) / (IQR / 1.349) betragsmässig über `threshold` liegt.
+# Da nur vergangene Tage in die Baseline eingehen, kann inkrementell
+# weitergerechnet werden (AnomalyDetector).
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+CLIMATE_PREFIXES = ('rohr_temp_', 'co2_', 'feucht_')
+
+WINDOW = 14
+MIN_PERIODS = 7
+THRESHOLD = 3.5
+# Untergrenze der Streuung relativ zum Median, damit konstante Phasen nicht jede Abweichung melden
+MIN_REL_SCALE = 0.05
+
+ANOMALY_COLS = ['datum', 'haus', 'spalte', 'wert', 'baseline', 'z']
+
+
+def climate_columns(df_klima):
+    return [c for c in df_klima.columns if c.startswith(CLIMATE_PREFIXES)]
+
+
+def robust_zscores(df_klima, columns=None, window=WINDOW, min_periods=MIN_PERIODS):
+    columns = columns or climate_columns(df_klima)
+    df = df_klima.sort_values(['haus', 'datum'])
+    haus = df['haus']
+
+    # Baseline nur aus den vorherigen Tagen desselben Hauses (aktueller Tag ausgeschlossen)
+    past = df.groupby('haus')[columns].shift(1)
+    rolling = past.groupby(haus).rolling(window, min_periods=min_periods)
+    median = rolling.median().reset_index(level=0, drop=True)
+    q25 = rolling.quantile(0.25).reset_index(level=0, drop=True)
+    q75 = rolling.quantile(0.75).reset_index(level=0, drop=True)
+
+    scale = np.maximum((q75 - q25) / 1.349, MIN_REL_SCALE * median.abs())
+    scale = scale.where(scale > 0)
+    z = (df[columns] - median) / scale
+    return df, median, z
+
+
+def find_anomalies(df_klima, columns=None, window=WINDOW, min_periods=MIN_PERIODS, threshold=THRESHOLD):
+    df, median, z = robust_zscores(df_klima, columns, window, min_periods)
+    columns = list(z.columns)
+
+    flagged = z.abs() > threshold
+    rows, cols = np.nonzero(flagged.to_numpy())
+    if len(rows) == 0:
+        return pd.DataFrame(columns=ANOMALY_COLS)
+
+    return pd.DataFrame({
+        'datum': df['datum'].to_numpy()[rows],
+        'haus': df['haus'].to_numpy()[rows],
+        'spalte': np.asarray(columns)[cols],
+        'wert': df[columns].to_numpy()[rows, cols],
+        'baseline': median.to_numpy()[rows, cols],
+        'z': z.to_numpy()[rows, cols],
+    }, index=df.index[rows])
+
+
+class AnomalyDetector:
+    # Rechnet bei neuen Messtagen nur den neuen Teil (plus `window` Tage Vorlauf je Haus)
+
+    def __init__(self, window=WINDOW, min_periods=MIN_PERIODS, threshold=THRESHOLD):
+        self.window = window
+        self.min_periods = min_periods
+        self.threshold = threshold
+        self.history = None
+        self.anomalies = pd.DataFrame(columns=ANOMALY_COLS)
+        self._lock = threading.Lock()
+
+    def update(self, df_klima):
+        # Wird von mehreren Sessions gemeinsam genutzt
+        with self._lock:
+            return self._update(df_klima)
+
+    def _update(self, df_klima):
+        if self.history is not None:
+            last_seen = self.history.groupby('haus')['datum'].max()
+            known = df_klima['haus'].map(last_seen)
+            new = df_klima[known.isna() | (df_klima['datum'] > known)]
+        else:
+            new = df_klima
+        if new.empty:
+            return pd.DataFrame(columns=ANOMALY_COLS)
+
+        parts = [new.assign(_neu=True)]
+        if self.history is not None:
+            parts.insert(0, self.history.assign(_neu=False))
+        chunk = pd.concat(parts, ignore_index=True)
+
+        result = find_anomalies(chunk, climate_columns(df_klima), self.window, self.min_periods, self.threshold)
+        result = result[chunk.loc[result.index, '_neu'].to_numpy(dtype=bool)]
+
+        self.anomalies = pd.concat([self.anomalies, result], ignore_index=True) if not self.anomalies.empty else result.reset_index(drop=True)
+        self.history = chunk.drop(columns='_neu').sort_values(['haus', 'datum']).groupby('haus').tail(self.window)
+        return result
@@ -1,12 +1,15 @@
 # app.py
 
 import streamlit as st
-import pandas as pd
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
+from postgrest.exceptions import APIError
 import ssl
 import httpx
 
+from wire_format import fetch_dataframe
+from query_cache import VersionedQueryCache, version_probe_sql
+
 # --- Globale Umgehung für SSL-Zertifikatsprobleme (Methode 1) ---
 try:
     _create_unverified_https_context = ssl._create_unverified_context
@@ -30,11 +33,36 @@ def init_connection():
 supabase = init_connection()
 
 # --- 2. Funktion zum Abfragen der Daten ---
-@st.cache_data
+# Übertragungsformat: "columnar" (Standard, spaltenweises JSON) oder "rows" (Zeilen-Objekte)
+WIRE_FORMAT = st.secrets.get("QUERY_WIRE_FORMAT", "columnar")
+
+def execute_sql(sql):
+    response = supabase.rpc('execute_sql', {'sql_query': sql}).execute()
+    return response.data
+
+def is_sql_error(error):
+    # Nur wenn die Datenbank das umschlossene SQL ablehnt (Syntax/Zugriff 42xxx, nicht unterstützt 0A000).
+    # Timeouts (57014), Ressourcenfehler (53xxx) und PostgREST-Fehler (PGRST...) werden weitergereicht,
+    # sonst würde die Abfrage bei Überlast gleich zweimal laufen
+    code = str(error.code or '') if isinstance(error, APIError) else ''
+    return code.startswith('42') or code == '0A000'
+
+def probe_versions():
+    df = fetch_dataframe(execute_sql, version_probe_sql(), "rows")
+    return dict(zip(df['tabelle'], df['version'])) if not df.empty else {}
+
+# Ergebnisse werden nur neu geladen, wenn sich eine der abgefragten Tabellen geändert hat
+@st.cache_resource
+def get_query_cache():
+    return VersionedQueryCache(
+        fetch=lambda query: fetch_dataframe(execute_sql, query, WIRE_FORMAT, is_sql_error),
+        probe=probe_versions,
+        max_entries=64,
+        probe_interval=30.0,
+    )
+
 def run_query(query):
-    response = supabase.rpc('execute_sql', {'sql_query': query}).execute()
-    data = response.data
-    return pd.DataFrame(data)
+    return get_query_cache().get(query)
 
 # --- 3. Streamlit App Layout ---
 st.set_page_config(layout="wide")
@@ -4,6 +4,22 @@ import plotly.express as px
 import plotly.graph_objects as go
 from pathlib import Path
 import os
+import time
+import uuid
+
+from anomalies import AnomalyDetector, climate_columns, THRESHOLD, WINDOW
+from analysis import (
+    compute_temperaturvergleich, build_temperatur_figure,
+    compute_lai_fruchtansatz, build_lai_fruchtansatz_figure,
+    compute_wachstumsmotor, build_wachstumsmotor_figure,
+    compute_sortenvergleich, build_sortenvergleich_figure,
+    compute_bluete_bis_ernte, build_bluete_bis_ernte_figure,
+    build_matrix_figure,
+)
+from forecast import YieldForecaster, build_panel, model_path
+from partitions import PartitionStore, SITES
+from prefetch import Prefetcher
+from truss_store import TrussStore
 
 # --- 1. SETUP & PFADE ---
 st.set_page_config(layout="wide", page_title="Greenhouse Data Analyzer")
@@ -12,47 +28,139 @@ st.set_page_config(layout="wide", page_title="Greenhouse Data Analyzer")
 BASE_DIR = Path(__file__).parent 
 
 # --- 2. DATEN-LADE-FUNKTION ---
-@st.cache_data
-def load_data(file_name):
-    full_path = BASE_DIR / file_name
+# Die CSVs werden einmal nach Standort/Haus partitioniert; eine Session lädt nur ihren Standort
+@st.cache_resource
+def get_partition_store():
+    store = PartitionStore(BASE_DIR)
     try:
-        df = pd.read_csv(full_path)
-        if 'datum' in df.columns:
-            df['datum'] = pd.to_datetime(df['datum'])
-        return df
-    except FileNotFoundError:
-        st.error(f"Datei nicht gefunden: {full_path}")
-        return None
+        store.refresh()
+    except FileNotFoundError as e:
+        st.error(f"Datei nicht gefunden: {e.filename}")
+    return store
+
+partition_store = get_partition_store()
+
+@st.cache_data
+def load_data(table, site):
+    return partition_store.load_site(table, site)
+
+# Standort-Auswahl
+selected_site = st.sidebar.selectbox("Standort", list(SITES))
 
 # Daten laden
-df_pflanzen = load_data('pflanzen.csv')
-df_klima = load_data('klima_messungen.csv')
-df_wachstum = load_data('wachstum_messungen.csv')
-df_produktion = load_data('produktion_messungen.csv')
+df_pflanzen = load_data('pflanzen', selected_site)
+df_klima = load_data('klima', selected_site)
+df_wachstum = load_data('wachstum', selected_site)
+df_produktion = load_data('produktion', selected_site)
+
+# Produktion zusätzlich als Truss-Store: kompakte Basis-Tabelle + Truss-Werte im Long-Format
+@st.cache_resource
+def load_truss_store(site):
+    df = load_data('produktion', site)
+    return TrussStore.from_wide(df) if df is not None else None
+
+truss_store = load_truss_store(selected_site)
+
+# --- PREFETCH: gemeinsamer Cache + Hintergrund-Worker für alle Sessions ---
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(max_workers=2, budget=6)
+
+prefetcher = get_prefetcher()
+prefetch_owner = st.session_state.setdefault("prefetch_owner", uuid.uuid4().hex)
+
+# --- STANDORT-ÜBERSICHT (aus den Partitions-Aggregaten, ohne Rohdaten) ---
+st.header("🏭 Standort-Übersicht: Wöchentliche Mittelwerte")
+summary_cols = {
+    'gh_gem_tagesdurchschnitt_c': 'Innentemperatur (°C)',
+    'aussen_strahlungssumme_j_cm2': 'Strahlungssumme (J/cm²)',
+    'co2_tag_ppm': 'CO2 Tag (ppm)',
+}
+summary_col = st.selectbox("Kennzahl (Standort-Übersicht)", list(summary_cols), format_func=summary_cols.get)
+fig_sites = go.Figure()
+for site in SITES:
+    site_summary = partition_store.site_summary('klima', site)
+    if summary_col in site_summary.columns:
+        fig_sites.add_trace(go.Scatter(
+            x=site_summary.index,
+            y=site_summary[summary_col],
+            mode='lines+markers',
+            name=site
+        ))
+fig_sites.update_layout(xaxis_title="Woche", yaxis_title=summary_cols[summary_col])
+st.plotly_chart(fig_sites, use_container_width=True)
+
+# --- VERGLEICHSMATRIX: HAUS/SORTE × WOCHE ---
+st.header("🗺️ Vergleichsmatrix: Häuser und Sorten pro Woche")
+
+@st.cache_data
+def load_weekly_matrix(table, column, site):
+    return partition_store.weekly_matrix(table, column, partition_store.houses(table, site))
+
+@st.cache_data
+def load_sorten_matrix(table, column, site):
+    return partition_store.sorten_matrix(table, column, partition_store.houses(table, site))
+
+site_frames = {'klima': df_klima, 'wachstum': df_wachstum, 'produktion': df_produktion}
+matrix_metrics = {col: table for table in site_frames for col in partition_store.aggregate_columns(table)}
+default_metric = 'gh_gem_tagesdurchschnitt_c'
+
+col_m1, col_m2 = st.columns(2)
+with col_m1:
+    metric_options = list(matrix_metrics)
+    matrix_metric = st.selectbox(
+        "Kennzahl (Matrix)", metric_options,
+        index=metric_options.index(default_metric) if default_metric in metric_options else 0
+    )
+matrix_table = matrix_metrics[matrix_metric]
+with col_m2:
+    # Klima wird pro Haus gemessen, Wachstum/Produktion pro Pflanze (-> Sorte möglich)
+    axis_options = ["Haus"] if matrix_table == 'klima' else ["Haus", "Sorte"]
+    matrix_axis = st.radio("Vergleich nach", axis_options, horizontal=True)
+
+if matrix_axis == "Haus":
+    matrix = load_weekly_matrix(matrix_table, matrix_metric, selected_site)
+else:
+    matrix = load_sorten_matrix(matrix_table, matrix_metric, selected_site)
+
+if not matrix.empty:
+    matrix_event = st.plotly_chart(
+        build_matrix_figure(matrix, matrix_metric, matrix_axis),
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="points",
+        key="matrix_chart"
+    )
+
+    # Drill-down: Klick auf eine Zelle zeigt die Einzelwerte dieses Hauses/dieser Sorte in dieser Woche
+    points = matrix_event.selection.points if matrix_event else []
+    if points:
+        drill_woche, drill_wert = points[0]['x'], str(points[0]['y'])
+        df_drill = site_frames[matrix_table]
+        if matrix_axis == "Haus" and 'haus' in df_drill.columns:
+            df_drill = df_drill[df_drill['haus'].astype(str) == drill_wert]
+        elif matrix_axis == "Haus":
+            # produktion_messungen hat keine Haus-Spalte -> Pflanzen des Hauses über die Stammdaten
+            ids = df_pflanzen.loc[df_pflanzen['haus'].astype(str) == drill_wert, 'pflanze_id']
+            df_drill = df_drill[df_drill['pflanze_id'].isin(ids)]
+        else:
+            ids = df_pflanzen.loc[df_pflanzen['sorte'] == drill_wert, 'pflanze_id']
+            df_drill = df_drill[df_drill['pflanze_id'].isin(ids)]
+        df_drill = df_drill[df_drill['woche'] == drill_woche]
+
+        st.subheader(f"🔎 {matrix_axis} {drill_wert}, Woche {drill_woche}")
+        id_cols = [c for c in ['datum', 'haus', 'pflanze_id', 'pflanze_nr'] if c in df_drill.columns]
+        st.dataframe(df_drill[id_cols + [matrix_metric]].sort_values(id_cols), use_container_width=True, hide_index=True)
+    else:
+        st.info("Klicke auf eine Zelle, um die Einzelwerte dieses Hauses bzw. dieser Sorte in dieser Woche zu sehen.")
+else:
+    st.warning(f"Keine Daten für '{matrix_metric}' am Standort {selected_site}.")
 
 # --- PLOT 1: INNEN- VS. AUSSENTEMPERATUR ---
 st.header("🌡️ Klima im Griff: Innen- vs. Aussentemperatur")
-import plotly.graph_objects as go
 
 if df_klima is not None:
-    temp_vergleich = df_klima.set_index('datum')[['gh_gem_tagesdurchschnitt_c', 'aussen_durchschnittstemp_c']]
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=temp_vergleich.index,
-        y=temp_vergleich['gh_gem_tagesdurchschnitt_c'],
-        mode='lines',
-        name='Innen'
-    ))
-    fig.add_trace(go.Scatter(
-        x=temp_vergleich.index,
-        y=temp_vergleich['aussen_durchschnittstemp_c'],
-        mode='lines',
-        name='Aussen'
-    ))
-    fig.update_layout(
-        xaxis_title="Datum",
-        yaxis_title="Temperatur in Grad Celsius"
-    )
+    fig = build_temperatur_figure(compute_temperaturvergleich(df_klima))
     st.plotly_chart(fig, use_container_width=True)
     st.info("Dieser Plot zeigt, wie gut Ihr Gewächshaus die Innentemperatur im Vergleich zur Aussentemperatur reguliert.")
 
@@ -61,27 +169,55 @@ if df_klima is not None and 'haus' in df_klima.columns:
     st.subheader("Durchschnittliche Innen vs. Aussentemperatur pro Haus")
     haus_options = df_klima['haus'].unique()
     selected_haus = st.selectbox("Haus auswählen", haus_options)
-    df_haus = df_klima[df_klima['haus'] == selected_haus]
-    temp_vergleich_haus = df_haus.set_index('datum')[['gh_gem_tagesdurchschnitt_c', 'aussen_durchschnittstemp_c']]
-    fig_haus = go.Figure()
-    fig_haus.add_trace(go.Scatter(
-        x=temp_vergleich_haus.index,
-        y=temp_vergleich_haus['gh_gem_tagesdurchschnitt_c'],
+    fig_haus = build_temperatur_figure(compute_temperaturvergleich(df_klima, selected_haus))
+    st.plotly_chart(fig_haus, use_container_width=True)
+    st.info(f"Vergleich der Temperaturen für Haus '{selected_haus}' über die Zeit.")
+
+# --- AUFFÄLLIGKEITEN IM KLIMA ---
+# Ein Detektor pro Standort; bei neuen Messtagen werden nur diese nachgerechnet
+@st.cache_resource
+def get_anomaly_detector(site):
+    return AnomalyDetector()
+
+if df_klima is not None and 'haus' in df_klima.columns:
+    st.subheader("🚨 Auffälligkeiten: Rohrtemperatur, CO2 und Feuchte")
+    anomaly_detector = get_anomaly_detector(selected_site)
+    anomaly_detector.update(df_klima)
+    auffaelligkeiten = anomaly_detector.anomalies
+
+    anomaly_col = st.selectbox("Klima-Parameter (Auffälligkeiten)", climate_columns(df_klima))
+    df_haus = df_klima[df_klima['haus'] == selected_haus].sort_values('datum')
+    marker_haus = auffaelligkeiten[(auffaelligkeiten['haus'] == selected_haus) & (auffaelligkeiten['spalte'] == anomaly_col)]
+
+    fig_anomalie = go.Figure()
+    fig_anomalie.add_trace(go.Scatter(
+        x=df_haus['datum'],
+        y=df_haus[anomaly_col],
         mode='lines',
-        name='Innen'
+        name=anomaly_col
     ))
-    fig_haus.add_trace(go.Scatter(
-        x=temp_vergleich_haus.index,
-        y=temp_vergleich_haus['aussen_durchschnittstemp_c'],
-        mode='lines',
-        name='Aussen'
+    fig_anomalie.add_trace(go.Scatter(
+        x=marker_haus['datum'],
+        y=marker_haus['wert'],
+        mode='markers',
+        name='Auffällig',
+        marker=dict(color='red', size=10, symbol='x'),
+        customdata=marker_haus[['baseline', 'z']],
+        hovertemplate="%{x|%d.%m.%Y}: %{y}<br>Baseline: %{customdata[0]:.2f}<br>z: %{customdata[1]:.1f}<extra></extra>"
     ))
-    fig_haus.update_layout(
-        xaxis_title="Datum",
-        yaxis_title="Temperatur in Grad Celsius"
+    fig_anomalie.update_layout(
+        title=f"{anomaly_col} (Haus {selected_haus})",
+        xaxis_title="Datum"
     )
-    st.plotly_chart(fig_haus, use_container_width=True)
-    st.info(f"Vergleich der Temperaturen für Haus '{selected_haus}' über die Zeit.")
+    st.plotly_chart(fig_anomalie, use_container_width=True)
+
+    st.write(f"**Auffälligkeiten am Standort {selected_site}** ({len(auffaelligkeiten)})")
+    st.dataframe(
+        auffaelligkeiten.sort_values(['datum', 'haus'], ascending=[False, True]),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.info(f"Auffällig ist ein Tageswert, der mehr als {THRESHOLD} robuste Standardabweichungen vom gleitenden Median der {WINDOW} Vortage des Hauses abweicht.")
 
 # --- PLOT 2: STRAHLUNG VS. WACHSTUM ---
 st.header("☀️🌱 Wachstumsmotor: Strahlung vs. Längenzuwachs pro Haus")
@@ -95,55 +231,24 @@ if df_pflanzen is not None and df_klima is not None and df_wachstum is not None:
     haus_options = pflanzen_kultur['haus'].unique()
     selected_haus = haus_options[0] if len(haus_options) == 1 else st.selectbox("Haus auswählen", haus_options)
 
-    # Filtere Klima- und Wachstumsdaten für die gewählte Kultur und das zugehörige Haus
-    df_klima_kultur_haus = df_klima[(df_klima['haus'] == selected_haus)]
-    df_wachstum_kultur_haus = df_wachstum[(df_wachstum['haus'] == selected_haus)]
-
-    # Berechne die durchschnittliche wöchentliche Strahlungssumme
-    strahlung_pro_woche = df_klima_kultur_haus.groupby('woche')['aussen_strahlungssumme_j_cm2'].mean().reset_index()
-
-    # Berechne den durchschnittlichen Längenzuwachs pro Woche
-    wachstum_pro_woche = df_wachstum_kultur_haus.groupby('woche')['laengenzuwachs_cm_woche'].mean().reset_index()
+    # Aggregate und Figur kommen aus dem gemeinsamen Cache (ggf. schon im Hintergrund vorberechnet)
+    def wachstumsmotor_task(kultur, haus):
+        return lambda: build_wachstumsmotor_figure(compute_wachstumsmotor(df_klima, df_wachstum, haus), kultur, haus)
 
-    # Führe die beiden Datensätze zusammen
-    merged_df = pd.merge(strahlung_pro_woche, wachstum_pro_woche, on='woche')
-
-    # Sortiere nach Woche, damit die Punkte chronologisch sind
-    merged_df = merged_df.sort_values('woche')
-
-    # Plotly Scatterplot: Woche auf x-Achse, Strahlung und Längenzuwachs als Linien
-    import plotly.graph_objects as go
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=merged_df['woche'],
-        y=merged_df['aussen_strahlungssumme_j_cm2'],
-        mode='lines+markers',
-        name='Strahlungssumme (J/cm²)'
-    ))
-    fig.add_trace(go.Scatter(
-        x=merged_df['woche'],
-        y=merged_df['laengenzuwachs_cm_woche'],
-        mode='lines+markers',
-        name='Längenzuwachs (cm/Woche)',
-        yaxis='y2'
-    ))
-    fig.update_layout(
-        title=f"Strahlung und Längenzuwachs pro Woche ({selected_kultur}, Haus {selected_haus})",
-        xaxis_title="Woche",
-        yaxis=dict(
-            title="Strahlungssumme (J/cm²)",
-            side="left"
-        ),
-        yaxis2=dict(
-            title="Längenzuwachs (cm/Woche)",
-            overlaying="y",
-            side="right"
-        ),
-        legend=dict(x=0.01, y=0.99)
+    fig = prefetcher.get_or_compute(
+        ("wachstumsmotor", selected_kultur, selected_haus),
+        wachstumsmotor_task(selected_kultur, selected_haus)
     )
     st.plotly_chart(fig, use_container_width=True)
     st.info("Die x-Achse zeigt die Wochen in chronologischer Reihenfolge. So siehst du, wie sich Strahlung und Wachstum gemeinsam über die Zeit entwickeln.")
 
+    # Nach dem Rendern: die anderen Häuser der gewählten Kultur vorberechnen
+    prefetcher.schedule(
+        (prefetch_owner, "wachstumsmotor"),
+        [(("wachstumsmotor", selected_kultur, h), wachstumsmotor_task(selected_kultur, h))
+         for h in haus_options if h != selected_haus]
+    )
+
 # --- PLOT 3: PRODUKTIONS-PIPELINE ---
 st.header("🍅 LAI vs. Fruchtansatz: Zusammenhang analysieren")
 if df_produktion is not None and df_pflanzen is not None:
@@ -155,49 +260,13 @@ if df_produktion is not None and df_pflanzen is not None:
     pflanzen_kultur = df_pflanzen[df_pflanzen['kultur'] == selected_kultur]
     pflanzen_ids = pflanzen_kultur['pflanze_id'].unique()
 
-    # Filtere Produktionsdaten für die gewählte Kultur
-    produktion_kultur = df_produktion[df_produktion['pflanze_id'].isin(pflanzen_ids)]
-
-    # Berechne durchschnittlichen LAI pro Woche aus df_wachstum und Fruchtansatz pro Woche aus produktion_kultur
+    # Berechne durchschnittlichen LAI pro Woche aus df_wachstum und Fruchtansatz pro Woche aus df_produktion
     if df_wachstum is not None:
-        # Filtere Wachstumsdaten für die gewählte Kultur
-        wachstum_kultur = df_wachstum[df_wachstum['pflanze_id'].isin(pflanzen_ids)]
-        lai_pro_woche = wachstum_kultur.groupby('woche')['lai_m2_m2'].mean().reset_index()
-        fruchtansatz_pro_woche = produktion_kultur.groupby('woche')['fruchtansatz_x_m2'].mean().reset_index()
-        # Führe die beiden Datensätze zusammen
-        lai_fruchtansatz = pd.merge(lai_pro_woche, fruchtansatz_pro_woche, on='woche')
+        lai_fruchtansatz = compute_lai_fruchtansatz(df_wachstum, df_produktion, pflanzen_ids)
     else:
-        lai_fruchtansatz = pd.DataFrame()
-
-    import plotly.graph_objects as go
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=lai_fruchtansatz['woche'],
-        y=lai_fruchtansatz['lai_m2_m2'],
-        mode='lines+markers',
-        name='LAI (m²/m²)',
-    ))
-    fig.add_trace(go.Scatter(
-        x=lai_fruchtansatz['woche'],
-        y=lai_fruchtansatz['fruchtansatz_x_m2'],
-        mode='lines+markers',
-        name='Fruchtansatz',
-        yaxis='y2'
-    ))
-    fig.update_layout(
-        title=f"LAI und Fruchtansatz pro Woche ({selected_kultur})",
-        xaxis_title="Woche",
-        yaxis=dict(
-            title="LAI",
-            side="left"
-        ),
-        yaxis2=dict(
-            title="Fruchtansatz_pro_m2",
-            overlaying="y",
-            side="right"
-        ),
-        legend=dict(x=0.01, y=0.99)
-    )
+        lai_fruchtansatz = pd.DataFrame(columns=['woche', 'lai_m2_m2', 'fruchtansatz_x_m2'])
+
+    fig = build_lai_fruchtansatz_figure(lai_fruchtansatz, selected_kultur)
     st.plotly_chart(fig, use_container_width=True)
     st.info("Dieser Plot zeigt den Zusammenhang zwischen Blattflächenindex (LAI) und Fruchtansatz pro Woche für die gewählte Kultur.")
 
@@ -208,26 +277,16 @@ if df_produktion is not None and df_pflanzen is not None:
     kultur_options = df_pflanzen['kultur'].unique()
     selected_kultur = st.selectbox("Kultur auswählen (Sortenvergleich)", kultur_options)
 
-    # Filtere Pflanzen-Stammdaten und Produktionsdaten für die gewählte Kultur
-    pflanzen_kultur = df_pflanzen[df_pflanzen['kultur'] == selected_kultur]
-    pflanzen_ids = pflanzen_kultur['pflanze_id'].unique()
-    produktion_kultur = df_produktion[df_produktion['pflanze_id'].isin(pflanzen_ids)]
-
-    # Führe Produktionsdaten und Pflanzen-Stammdaten zusammen
-    sorten_df = pd.merge(produktion_kultur, pflanzen_kultur, on='pflanze_id')
+    def sortenvergleich_task(kultur):
+        def task():
+            produktion_pro_sorte = compute_sortenvergleich(df_produktion, df_pflanzen, kultur)
+            return produktion_pro_sorte, build_sortenvergleich_figure(produktion_pro_sorte)
+        return task
 
-    # Berechne die durchschnittliche Produktion pro Sorte
-    produktion_pro_sorte = sorten_df.groupby('sorte')['produktion_x_m2'].mean().sort_values(ascending=False)
-
-    import plotly.express as px
-    fig = px.bar(
-        produktion_pro_sorte,
-        x=produktion_pro_sorte.index,
-        y=produktion_pro_sorte.values,
-        labels={'x': 'Sorte', 'y': 'Produktion pro m²'},
-        title="Durchschnittliche Produktion pro Sorte"
+    produktion_pro_sorte, fig = prefetcher.get_or_compute(
+        ("sortenvergleich", selected_site, selected_kultur),
+        sortenvergleich_task(selected_kultur)
     )
-    fig.update_yaxes(title_text="Produktion pro m²")
     st.plotly_chart(fig, use_container_width=True)
 
     beste_sorte = produktion_pro_sorte.idxmax() if not produktion_pro_sorte.empty else None
@@ -235,6 +294,86 @@ if df_produktion is not None and df_pflanzen is not None:
         st.success(f"Die Sorte mit der höchsten durchschnittlichen Produktion für '{selected_kultur}' ist: **{beste_sorte}**")
     st.info("Dieser Plot vergleicht die durchschnittliche Produktion (in kg oder Anzahl pro m²) für jede Sorte innerhalb der gewählten Kultur.")
 
+    # Nach dem Rendern: die anderen Kulturen vorberechnen
+    prefetcher.schedule(
+        (prefetch_owner, "sortenvergleich"),
+        [(("sortenvergleich", selected_site, k), sortenvergleich_task(k)) for k in kultur_options if k != selected_kultur]
+    )
+
+# --- ERTRAGSPROGNOSE ---
+st.header("🔮 Ertragsprognose: Produktion der kommenden Wochen pro Sorte")
+
+@st.cache_data
+def load_forecast_panel(site):
+    return build_panel(df_pflanzen, df_klima, df_wachstum, df_produktion)
+
+# Ein Modell pro Standort, gespeichert unter models/; neue Wochen werden inkrementell nachtrainiert
+@st.cache_resource
+def get_forecaster(site):
+    return YieldForecaster.load(model_path(site))
+
+if all(df is not None for df in [df_pflanzen, df_klima, df_wachstum, df_produktion]):
+    forecast_panel = load_forecast_panel(selected_site)
+    forecaster = get_forecaster(selected_site)
+    new_rows = forecaster.update(forecast_panel)
+    if new_rows:
+        forecaster.save(model_path(selected_site))
+
+    start = time.perf_counter()
+    prognosen = forecaster.predict(forecast_panel)
+    score_seconds = time.perf_counter() - start
+
+    kultur_options = df_pflanzen['kultur'].unique()
+    selected_kultur = st.selectbox("Kultur auswählen (Ertragsprognose)", kultur_options)
+    prognosen_kultur = prognosen[(prognosen['kultur'] == selected_kultur) & prognosen['prognose'].notna()]
+
+    if not prognosen_kultur.empty:
+        prognose_pro_sorte = prognosen_kultur.groupby(['sorte', 'woche'])['prognose'].mean().reset_index()
+        fig = px.line(
+            prognose_pro_sorte,
+            x='woche',
+            y='prognose',
+            color='sorte',
+            markers=True,
+            labels={'woche': 'Woche', 'prognose': 'Prognose Produktion pro m²', 'sorte': 'Sorte'},
+            title=f"Prognostizierte Produktion pro Sorte ({selected_kultur})"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(
+            prognosen_kultur.pivot_table(index=['sorte', 'haus', 'pflanze_id', 'basis_woche'], columns='woche', values='prognose').round(1),
+            use_container_width=True
+        )
+    else:
+        st.warning(f"Für '{selected_kultur}' liegen noch nicht genug Wochen für eine Prognose vor.")
+
+    # Pflanzen ohne Prognose (kein Modell für Sorte/Kultur) und mit aufgefüllten Merkmalen ausweisen
+    pflanzen_kultur = df_pflanzen[df_pflanzen['kultur'] == selected_kultur]
+    ohne_prognose = pflanzen_kultur[~pflanzen_kultur['pflanze_id'].isin(prognosen_kultur['pflanze_id'])]
+    imputiert = prognosen_kultur.loc[prognosen_kultur['imputiert'], 'pflanze_id'].nunique()
+    if imputiert:
+        st.caption(f"{imputiert} Pflanzen mit aufgefüllten Merkmalen (letzter Wert der Pflanze bzw. Wochenmittel von Standort/Kultur).")
+    if not ohne_prognose.empty:
+        with st.expander(f"{len(ohne_prognose)} Pflanzen ohne Prognose"):
+            st.dataframe(ohne_prognose[['pflanze_id', 'haus', 'sorte']], use_container_width=True, hide_index=True)
+
+    training = f"Letztes Training: {forecaster.train_seconds * 1e3:.0f} ms" + ("" if new_rows else " (keine neuen Wochen)")
+    st.caption(f"{training} · Prognose für {prognosen['pflanze_id'].nunique()} Pflanzen: {score_seconds * 1e3:.0f} ms")
+    st.info("Ridge-Regression pro Sorte (Rückfall: pro Kultur) auf Produktion, Fruchtansatz, LAI, Längenzuwachs, Strahlungssumme und Innentemperatur der letzten Wochen.")
+
+# --- PLOT 5: TRUSS-ANALYSE ---
+st.header("⏱️ Truss-Analyse: Wie lange dauert es von der Blüte bis zur Ernte?")
+if truss_store is not None and df_pflanzen is not None:
+    kultur_options = df_pflanzen['kultur'].unique()
+    selected_kultur = st.selectbox("Kultur auswählen (Blüte bis Ernte)", kultur_options)
+
+    bluete_bis_ernte = compute_bluete_bis_ernte(truss_store, df_pflanzen, selected_kultur)
+    if not bluete_bis_ernte.empty:
+        fig = build_bluete_bis_ernte_figure(bluete_bis_ernte, selected_kultur)
+        st.plotly_chart(fig, use_container_width=True)
+        st.info("Jeder Punkt ist eine Truss: Tage zwischen der ersten Blüte und der ersten geernteten Frucht auf dieser Truss.")
+    else:
+        st.warning(f"Keine Truss-Daten mit Blüte und Ernte für '{selected_kultur}' gefunden.")
+
 
 
 # --- 3. MASTER DATAFRAME ERSTELLEN (Alles zusammenführen) ---
@@ -249,9 +388,10 @@ def create_master_df():
         master = pd.merge(master, df_wachstum, on=['datum', 'haus'], how='outer')
     
     # Mergen mit Produktion (über Datum und Haus/Pflanze falls vorhanden)
-    if df_produktion is not None:
+    # Nur die kompakte Basis-Tabelle: die Truss-Spalten bleiben im Truss-Store
+    if truss_store is not None:
         # Falls produktion_messungen keine 'haus' Spalte hat, müssen wir sie über df_pflanzen holen
-        prod_tmp = df_produktion.copy()
+        prod_tmp = truss_store.base
         if 'haus' not in prod_tmp.columns and df_pflanzen is not None:
             prod_tmp = pd.merge(prod_tmp, df_pflanzen[['pflanze_id', 'haus', 'kultur']], on='pflanze_id', how='left')
         
@@ -268,9 +408,21 @@ def create_master_df():
     # Woche/ID/Jahr oft nicht sinnvoll für Korrelation, optional entfernen:
     blacklist = ['woche', 'jahr', 'pflanze_id', 'pflanze_nr']
     numeric_cols = [c for c in numeric_cols if c not in blacklist]
+
+    # Truss-Spalten bleiben auswählbar; sie werden erst bei Auswahl über with_truss_columns geladen
+    if truss_store is not None:
+        numeric_cols += [c for c in truss_store.truss_columns if c not in numeric_cols]
     
     return master, numeric_cols
 
+def with_truss_columns(df, cols):
+    # Gewählte Truss-Spalten on demand aus dem Truss-Store (breite Ansicht) ergänzen
+    needed = [c for c in dict.fromkeys(cols) if c and c not in df.columns]
+    if truss_store is None or not needed:
+        return df
+    truss_wide = truss_store.wide(needed).set_index('produktion_id')
+    return df.assign(**{c: df['produktion_id'].map(truss_wide[c]) for c in needed})
+
 df_master, numeric_cols = create_master_df()
 
 # --- 4. SIDEBAR FILTER ---
@@ -309,6 +461,8 @@ with st.expander("Einstellungen für Korrelationsplot", expanded=True):
         if show_y2:
             y_param_right = st.selectbox("Y-Achse Rechts", options=numeric_cols, index=2)
 
+df_filtered = with_truss_columns(df_filtered, [x_param, y_param, y_param_right])
+
 # Plot erstellen
 fig1 = px.scatter(
     df_filtered,
@@ -360,6 +514,7 @@ with st.expander("Einstellungen für Zeitachse", expanded=True):
     y_multi = st.multiselect("Parameter wählen (Y-Achse)", options=numeric_cols, default=[numeric_cols[0]])
     
     if len(y_multi) >= 1:
+        df_filtered = with_truss_columns(df_filtered, y_multi)
         fig2 = go.Figure()
         for p in y_multi:
             # Durchschnitt pro Datum (falls mehrere Messungen pro Tag)
@@ -0,0 +1,106 @@
+# bench_wire_format.py
+#
+# Vergleicht "rows" und "columnar" (siehe wire_format.py) an einer lokalen
+# Stand-in für den Supabase-RPC-Endpunkt. Der Server liefert klima_messungen.csv
+# (vervielfacht) in beiden Formaten; gemessen werden Antwortgrösse,
+# Dekodier-Zeit und Spitzen-Speicher auf Client-Seite.
+#
+#   python bench_wire_format.py --repeat 20 --runs 5
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from wire_format import COLUMNS_KEY, decode_columnar, decode_rows
+
+BASE_DIR = Path(__file__).parent
+
+
+def _to_json_values(df):
+    # NaN -> null wie bei PostgREST
+    df = df.astype(object).where(df.notna(), None)
+    return df
+
+
+def build_payloads(repeat):
+    df = pd.read_csv(BASE_DIR / 'klima_messungen.csv')
+    df = pd.concat([df] * repeat, ignore_index=True)
+    df['klima_id'] = np.arange(1, len(df) + 1)
+    df = _to_json_values(df)
+
+    rows = json.dumps(df.to_dict(orient='records')).encode()
+    columns = json.dumps([{COLUMNS_KEY: df.to_dict(orient='list')}]).encode()
+    return len(df), {'/rows': rows, '/columnar': columns}
+
+
+def start_server(payloads):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = payloads.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(client, url, decode):
+    body = client.get(url).content
+
+    # Zeit und Speicher getrennt messen: tracemalloc bremst das Dekodieren stark
+    start = time.perf_counter()
+    df = decode(json.loads(body))
+    dauer = time.perf_counter() - start
+
+    tracemalloc.start()
+    decode(json.loads(body))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(body), dauer, peak, df.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: Zeilen- vs. spaltenweises JSON")
+    parser.add_argument("--repeat", type=int, default=20, help="klima_messungen.csv so oft vervielfachen")
+    parser.add_argument("--runs", type=int, default=5, help="Messläufe pro Format")
+    args = parser.parse_args()
+
+    n_rows, payloads = build_payloads(args.repeat)
+    server = start_server(payloads)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{n_rows} Zeilen x {pd.read_csv(BASE_DIR / 'klima_messungen.csv', nrows=0).shape[1]} Spalten")
+    print(f"{'Format':<10} {'Antwort (MB)':>12} {'Dekodieren (ms)':>16} {'Peak-Speicher (MB)':>19}")
+    try:
+        with httpx.Client() as client:
+            for name, decode in (('rows', decode_rows), ('columnar', decode_columnar)):
+                results = [measure(client, f"{base_url}/{name}", decode) for _ in range(args.runs)]
+                size = results[0][0]
+                dauer = statistics.median(r[1] for r in results)
+                peak = statistics.median(r[2] for r in results)
+                print(f"{name:<10} {size / 1e6:>12.2f} {dauer * 1e3:>16.1f} {peak / 1e6:>19.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# forecast.py
+#
+# Ertragsprognose (produktion_x_m2) pro Kultur/Sorte für die kommenden Wochen.
+#
+# Pro Sorte (und als Rückfall pro Kultur) wird eine Ridge-Regression auf
+# wöchentlichen Klima- und Wachstumsmerkmalen trainiert, eine pro Prognose-
+# Horizont. Gespeichert werden nur die Summen X'X und X'y; neue Wochen werden
+# einfach dazuaddiert, ohne die alten Daten erneut zu lesen. Die Prognose für
+# alle Pflanzen läuft als ein einziges Matrixprodukt.
+#
+#   python forecast.py [--site TGW] [--horizons 4] [--full]
+
+import argparse
+import pickle
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+MODEL_DIR = BASE_DIR / 'models'
+
+TARGET = 'produktion_x_m2'
+
+# Merkmale der Woche t (und t-1), bekannt zum Zeitpunkt der Prognose
+FEATURES = [
+    'produktion_x_m2',
+    'fruchtansatz_x_m2',
+    'fruchtansatz_x_m2_lag1',
+    'lai_m2_m2',
+    'laengenzuwachs_cm_woche',
+    'strahlungssumme_woche',
+    'strahlungssumme_woche_lag1',
+    'gh_gem_tagesdurchschnitt_c',
+]
+
+# Klima-Merkmale gelten für das ganze Haus und können aus dem Standort-Wochenmittel ergänzt werden
+CLIMATE_FEATURES = ['strahlungssumme_woche', 'strahlungssumme_woche_lag1', 'gh_gem_tagesdurchschnitt_c']
+
+FORECAST_COLS = ['pflanze_id', 'haus', 'kultur', 'sorte', 'basis_woche', 'imputiert', 'horizont', 'woche', 'prognose']
+
+
+def _shift_weeks(panel, cols, weeks):
+    # Werte aus Woche t-weeks an Woche t anhängen (weeks < 0: aus der Zukunft)
+    shifted = panel[cols].reset_index()
+    shifted['woche'] += weeks
+    return shifted.set_index(['pflanze_id', 'woche']).reindex(panel.index)
+
+
+def build_panel(df_pflanzen, df_klima, df_wachstum, df_produktion, horizons=4):
+    # Eine Zeile pro Pflanze und Woche mit Merkmalen und Zielwerten ziel_h1..ziel_hN
+    produktion = df_produktion.groupby(['pflanze_id', 'woche'])[['produktion_x_m2', 'fruchtansatz_x_m2']].mean()
+    wachstum = df_wachstum.groupby(['pflanze_id', 'woche'])[['lai_m2_m2', 'laengenzuwachs_cm_woche']].mean()
+    # Strahlung als Tagesmittel × 7, damit angefangene Wochen nicht zu niedrig ausfallen
+    klima = df_klima.groupby(['haus', 'woche']).agg(
+        strahlungssumme_woche=('aussen_strahlungssumme_j_cm2', 'mean'),
+        gh_gem_tagesdurchschnitt_c=('gh_gem_tagesdurchschnitt_c', 'mean'),
+    )
+    klima['strahlungssumme_woche'] *= 7
+
+    panel = produktion.join(wachstum, how='left').reset_index()
+    panel = panel.merge(df_pflanzen[['pflanze_id', 'haus', 'kultur', 'sorte']], on='pflanze_id')
+    panel = panel.merge(klima.reset_index(), on=['haus', 'woche'], how='left')
+    panel = panel.set_index(['pflanze_id', 'woche']).sort_index()
+
+    lag = _shift_weeks(panel, ['fruchtansatz_x_m2', 'strahlungssumme_woche'], 1)
+    panel['fruchtansatz_x_m2_lag1'] = lag['fruchtansatz_x_m2']
+    panel['strahlungssumme_woche_lag1'] = lag['strahlungssumme_woche']
+
+    for h in range(1, horizons + 1):
+        panel[f'ziel_h{h}'] = _shift_weeks(panel, [TARGET], -h)[TARGET]
+    return panel
+
+
+def impute_features(panel):
+    # Fehlende Merkmale für die Prognose: letzter Wert der Pflanze, bei Klima sonst Wochenmittel des Standorts,
+    # sonst Wochenmittel der Kultur, sonst Kulturmittel
+    features = panel[FEATURES].groupby(level='pflanze_id').ffill()
+    woche = panel.index.get_level_values('woche')
+    features[CLIMATE_FEATURES] = features[CLIMATE_FEATURES].fillna(features[CLIMATE_FEATURES].groupby(woche).transform('mean'))
+    features = features.fillna(features.groupby([panel['kultur'], woche]).transform('mean'))
+    return features.fillna(features.groupby(panel['kultur']).transform('mean'))
+
+
+def _design(panel):
+    X = panel[FEATURES].to_numpy(dtype=float)
+    return np.column_stack([np.ones(len(X)), X])
+
+
+class YieldForecaster:
+    def __init__(self, horizons=4, ridge=1e-2, min_rows=None):
+        self.horizons = horizons
+        self.ridge = ridge
+        self.n_params = len(FEATURES) + 1
+        self.min_rows = min_rows if min_rows is not None else 2 * self.n_params
+        # Modell-Schlüssel ('kultur', k) bzw. ('sorte', k, s) -> Summen je Horizont
+        self.stats = {}
+        self.seen = [set() for _ in range(horizons)]
+        self._coefs = None
+        self._lock = threading.Lock()
+        self.train_seconds = 0.0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        state['_coefs'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _model_stats(self, key):
+        if key not in self.stats:
+            p = self.n_params
+            self.stats[key] = {
+                'xtx': np.zeros((self.horizons, p, p)),
+                'xty': np.zeros((self.horizons, p)),
+                'n': np.zeros(self.horizons, dtype=int),
+            }
+        return self.stats[key]
+
+    # --- TRAINING ---
+    def update(self, panel):
+        # Nur Pflanze/Woche-Kombinationen aufnehmen, die noch nicht trainiert wurden
+        with self._lock:
+            start = time.perf_counter()
+            X_all = _design(panel)
+            complete = ~np.isnan(X_all).any(axis=1)
+            new_rows = 0
+
+            for h in range(self.horizons):
+                y_all = panel[f'ziel_h{h + 1}'].to_numpy(dtype=float)
+                mask = complete & ~np.isnan(y_all) & ~panel.index.isin(list(self.seen[h]))
+                if not mask.any():
+                    continue
+                rows = panel[mask]
+                X, y = X_all[mask], y_all[mask]
+
+                # dropna=False: Pflanzen ohne Sorte zählen nur für das Kultur-Modell
+                for (kultur, sorte), idx in rows.groupby(['kultur', 'sorte'], dropna=False).indices.items():
+                    xtx, xty = X[idx].T @ X[idx], X[idx].T @ y[idx]
+                    keys = [('kultur', kultur)] + ([] if pd.isna(sorte) else [('sorte', kultur, sorte)])
+                    for key in keys:
+                        stats = self._model_stats(key)
+                        stats['xtx'][h] += xtx
+                        stats['xty'][h] += xty
+                        stats['n'][h] += len(idx)
+
+                self.seen[h].update(rows.index)
+                new_rows += int(mask.sum())
+
+            # Dauer nur für echte Trainingsläufe merken, nicht für Aufrufe ohne neue Wochen
+            if new_rows:
+                self._coefs = None
+                self.train_seconds = time.perf_counter() - start
+            return new_rows
+
+    def _solve(self, stats):
+        # Ridge mit Strafterm relativ zur Diagonale (skalenunabhängig), Achsenabschnitt ungestraft
+        coefs = np.full((self.horizons, self.n_params), np.nan)
+        for h in range(self.horizons):
+            if stats['n'][h] < self.min_rows:
+                continue
+            xtx = stats['xtx'][h]
+            penalty = self.ridge * np.diag(np.diag(xtx))
+            penalty[0, 0] = 0.0
+            coefs[h] = np.linalg.lstsq(xtx + penalty, stats['xty'][h], rcond=None)[0]
+        return coefs
+
+    def coefficients(self):
+        if self._coefs is None:
+            self._coefs = {key: self._solve(stats) for key, stats in self.stats.items()}
+        return self._coefs
+
+    # --- PROGNOSE ---
+    def predict(self, panel):
+        # Für jede Pflanze ab ihrer letzten Woche, alle Horizonte auf einmal; fehlende Merkmale werden aufgefüllt
+        latest = panel.copy()
+        latest['imputiert'] = panel[FEATURES].isna().any(axis=1)
+        latest[FEATURES] = impute_features(panel)
+        latest = latest.reset_index().groupby('pflanze_id').tail(1)
+        latest = latest[latest[FEATURES].notna().all(axis=1)]
+        if latest.empty:
+            return pd.DataFrame(columns=FORECAST_COLS)
+        X = _design(latest)
+
+        # Koeffizienten je Pflanze: Sorten-Modell, sonst Kultur-Modell
+        coefs = self.coefficients()
+        empty = np.full((self.horizons, self.n_params), np.nan)
+        C = np.empty((len(latest), self.horizons, self.n_params))
+        for i, (kultur, sorte) in enumerate(zip(latest['kultur'], latest['sorte'])):
+            sorte_coefs = coefs.get(('sorte', kultur, sorte), empty)
+            kultur_coefs = coefs.get(('kultur', kultur), empty)
+            C[i] = np.where(np.isnan(sorte_coefs).any(axis=1, keepdims=True), kultur_coefs, sorte_coefs)
+
+        prognose = np.einsum('np,nhp->nh', X, C)
+
+        result = latest[['pflanze_id', 'haus', 'kultur', 'sorte', 'woche', 'imputiert']].rename(columns={'woche': 'basis_woche'})
+        result = result.loc[result.index.repeat(self.horizons)].reset_index(drop=True)
+        result['horizont'] = np.tile(np.arange(1, self.horizons + 1), len(latest))
+        result['woche'] = result['basis_woche'] + result['horizont']
+        result['prognose'] = prognose.ravel()
+        return result[FORECAST_COLS]
+
+    # --- PERSISTENZ ---
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            with open(path, 'wb') as f:
+                pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path, horizons=4):
+        path = Path(path)
+        if path.exists():
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+            if model.horizons == horizons:
+                return model
+        return cls(horizons=horizons)
+
+
+def model_path(site=None):
+    return MODEL_DIR / f"ertrag_{site or 'alle'}.pkl"
+
+
+def main():
+    from partitions import PartitionStore, SITES
+
+    parser = argparse.ArgumentParser(description="Trainiert/aktualisiert die Ertragsprognose und bewertet alle Pflanzen.")
+    parser.add_argument("--site", choices=list(SITES), default=None, help="Nur diesen Standort (Standard: alle)")
+    parser.add_argument("--horizons", type=int, default=4, help="Anzahl Prognose-Wochen")
+    parser.add_argument("--full", action="store_true", help="Modelle komplett neu trainieren")
+    parser.add_argument("--out", default=None, help="Prognosen zusätzlich als CSV schreiben")
+    args = parser.parse_args()
+
+    store = PartitionStore(BASE_DIR)
+    store.refresh()
+    sites = [args.site] if args.site else list(SITES)
+
+    for site in sites:
+        tables = {t: store.load_site(t, site) for t in ('pflanzen', 'klima', 'wachstum', 'produktion')}
+        if any(df is None for df in tables.values()):
+            print(f"{site}: keine Daten")
+            continue
+
+        start = time.perf_counter()
+        panel = build_panel(tables['pflanzen'], tables['klima'], tables['wachstum'], tables['produktion'], args.horizons)
+        panel_seconds = time.perf_counter() - start
+
+        path = model_path(site)
+        model = YieldForecaster(horizons=args.horizons) if args.full else YieldForecaster.load(path, args.horizons)
+        new_rows = model.update(panel)
+        model.save(path)
+
+        start = time.perf_counter()
+        forecasts = model.predict(panel)
+        score_seconds = time.perf_counter() - start
+
+        training = f"Training {model.train_seconds * 1e3:.0f} ms ({new_rows} neue Zeilen)" if new_rows else "keine neuen Zeilen"
+        print(f"{site}: Merkmale {panel_seconds * 1e3:.0f} ms, {training}, "
+              f"Prognose {score_seconds * 1e3:.0f} ms für {forecasts['pflanze_id'].nunique()} Pflanzen")
+        if args.out:
+            forecasts.assign(standort=site).to_csv(
+                args.out, mode='a' if site != sites[0] else 'w', header=site == sites[0], index=False
+            )
+
+
+if __name__ == "__main__":
+    main()
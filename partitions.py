@@ -0,0 +1,191 @@
+# partitions.py
+#
+# Aufteilung der Messdaten nach Standort und Haus.
+# Die Standorte entsprechen greenhouse-app/script.js (TGW, ELN).
+#
+# Beim ersten Zugriff (und immer wenn sich eine Quell-CSV geändert hat) wird
+# jede Tabelle einmal gelesen und pro Haus als eigene Datei abgelegt, zusammen
+# mit wöchentlichen Summen/Anzahlen aller numerischen Spalten. Danach lädt eine
+# Session nur die Häuser ihres Standorts; Übersichten pro Standort werden aus
+# diesen Aggregaten berechnet, ohne Rohdaten zu laden. Für Tabellen mit
+# pflanze_id gibt es zusätzlich Summen/Anzahlen pro Woche und Sorte.
+#
+# Jeder Neuaufbau schreibt in ein neues Versions-Verzeichnis und schaltet dann
+# `current.json` atomar um, damit eine laufende App nie halb geschriebene
+# Partitionen liest. Die vorherige Version bleibt bis zum nächsten Aufbau liegen.
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from analysis import read_measurements
+
+SITES = {
+    'TGW': ['2+3', '4', '5', '6', '7'],
+    'ELN': ['19', '20', '21', '22', '23', '31', '32', '33', '34'],
+}
+
+TABLES = {
+    'pflanzen': 'pflanzen.csv',
+    'klima': 'klima_messungen.csv',
+    'wachstum': 'wachstum_messungen.csv',
+    'produktion': 'produktion_messungen.csv',
+}
+
+# Tabellen ohne eigene Haus-Spalte bekommen das Haus über pflanzen.csv
+HOUSE_FROM_PFLANZEN = {'produktion'}
+# Tabellen mit Sorten-Aggregaten (Sorte über pflanzen.csv); beide müssen auch
+# neu aufgebaut werden, wenn sich pflanzen.csv ändert
+SORTE_FROM_PFLANZEN = {'wachstum', 'produktion'}
+
+# Spalten, die nicht sinnvoll aggregiert werden
+AGG_BLACKLIST = ['woche', 'jahr', 'pflanze_id', 'pflanze_nr', 'klima_id', 'wachstum_id', 'produktion_id']
+
+
+def site_of(haus):
+    for site, houses in SITES.items():
+        if str(haus) in houses:
+            return site
+    return None
+
+
+class PartitionStore:
+    def __init__(self, base_dir, cache_dir=None):
+        self.base_dir = Path(base_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else self.base_dir / 'partitions'
+
+    def _table_dir(self, table):
+        return self.cache_dir / table
+
+    def _manifest(self, table):
+        path = self._table_dir(table) / 'current.json'
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def _house_path(self, table, haus, kind='rows', manifest=None):
+        manifest = manifest if manifest is not None else self._manifest(table)
+        version = manifest['version'] if manifest else ''
+        return self._table_dir(table) / version / f"site={site_of(haus)}" / f"haus={haus}.{kind}.pkl"
+
+    def _source_mtimes(self, table):
+        depends = table in HOUSE_FROM_PFLANZEN or table in SORTE_FROM_PFLANZEN
+        files = [TABLES[table]] + ([TABLES['pflanzen']] if depends else [])
+        return {f: (self.base_dir / f).stat().st_mtime for f in files}
+
+    # --- AUFBAU ---
+    def refresh(self):
+        # Baut nur Tabellen neu auf, deren Quell-CSVs (inkl. pflanzen.csv für die Haus-Zuordnung) sich geändert haben
+        pflanzen = None
+        for table, file_name in TABLES.items():
+            mtimes = self._source_mtimes(table)
+            manifest = self._manifest(table)
+            if manifest is not None and manifest.get('source_mtimes') == mtimes:
+                continue
+
+            df = read_measurements(self.base_dir / file_name)
+            if pflanzen is None and len(mtimes) > 1:
+                pflanzen = read_measurements(self.base_dir / TABLES['pflanzen']).set_index('pflanze_id')
+            if table in HOUSE_FROM_PFLANZEN:
+                # produktion_messungen hat kein Haus -> über die Pflanzen-Stammdaten
+                haus = df['pflanze_id'].map(pflanzen['haus'].astype(str))
+            else:
+                haus = df['haus'].astype(str)
+            sorte = df['pflanze_id'].map(pflanzen['sorte']) if table in SORTE_FROM_PFLANZEN else None
+            self._write_table(table, df, haus, sorte, mtimes)
+
+    def _write_table(self, table, df, haus, sorte, mtimes):
+        table_dir = self._table_dir(table)
+        previous = self._manifest(table)
+        manifest = {'version': f"v{time.time_ns()}", 'source_mtimes': mtimes, 'houses': []}
+
+        for h, part in df.groupby(haus, sort=False):
+            path = self._house_path(table, h, manifest=manifest)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            part.reset_index(drop=True).to_pickle(path)
+            if 'woche' in part.columns:
+                self._weekly_aggregates(part).to_pickle(self._house_path(table, h, 'agg', manifest))
+                if sorte is not None:
+                    self._weekly_aggregates(part, sorte[part.index]).to_pickle(self._house_path(table, h, 'sorte', manifest))
+            manifest['houses'].append(h)
+
+        # Atomar umschalten; Leser mit der alten Version lesen diese noch zu Ende
+        tmp = table_dir / 'current.json.tmp'
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, table_dir / 'current.json')
+
+        # Alles ausser der neuen und der direkt vorherigen Version aufräumen
+        keep = {manifest['version'], previous['version'] if previous else None}
+        for entry in table_dir.iterdir():
+            if entry.is_dir() and entry.name not in keep:
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @staticmethod
+    def _weekly_aggregates(part, sorte=None):
+        cols = [c for c in part.select_dtypes(include=['number']).columns if c not in AGG_BLACKLIST]
+        keys = ['woche'] if sorte is None else [part['woche'], sorte.rename('sorte')]
+        grouped = part.groupby(keys)[cols]
+        return pd.concat({'sum': grouped.sum(), 'count': grouped.count()}, axis=1)
+
+    # --- LESEN ---
+    def houses(self, table, site=None):
+        manifest = self._manifest(table)
+        houses = manifest['houses'] if manifest else []
+        return [h for h in houses if site is None or site_of(h) == site]
+
+    def _read_parts(self, table, houses, kind):
+        manifest = self._manifest(table)
+        if manifest is None:
+            return []
+        paths = [self._house_path(table, h, kind, manifest) for h in houses]
+        return [pd.read_pickle(path) for path in paths if path.exists()]
+
+    def load(self, table, houses):
+        parts = self._read_parts(table, houses, 'rows')
+        if not parts:
+            return None
+        return pd.concat(parts, ignore_index=True)
+
+    def load_site(self, table, site):
+        return self.load(table, self.houses(table, site))
+
+    def weekly_summary(self, table, houses):
+        # Wöchentlicher Mittelwert über die Häuser, aus Summen/Anzahlen der Partitionen
+        aggs = self._read_parts(table, houses, 'agg')
+        if not aggs:
+            return pd.DataFrame()
+        total = pd.concat(aggs).groupby(level=0).sum()
+        return total['sum'] / total['count'].where(total['count'] > 0)
+
+    def site_summary(self, table, site):
+        return self.weekly_summary(table, self.houses(table, site))
+
+    def aggregate_columns(self, table):
+        for agg in self._read_parts(table, self.houses(table)[:1], 'agg'):
+            return list(agg['sum'].columns)
+        return []
+
+    def weekly_matrix(self, table, column, houses):
+        # Woche × Haus-Matrix einer Kennzahl direkt aus den Partitions-Aggregaten
+        manifest = self._manifest(table)
+        matrix = {}
+        for h in houses:
+            path = self._house_path(table, h, 'agg', manifest)
+            if manifest is None or not path.exists():
+                continue
+            agg = pd.read_pickle(path)
+            if column in agg['sum'].columns:
+                matrix[h] = agg[('sum', column)] / agg[('count', column)].where(agg[('count', column)] > 0)
+        return pd.DataFrame(matrix).sort_index()
+
+    def sorten_matrix(self, table, column, houses):
+        # Woche × Sorte-Matrix aus den Sorten-Aggregaten der Häuser (Summen addieren, dann teilen)
+        aggs = self._read_parts(table, houses, 'sorte')
+        aggs = [agg[[('sum', column), ('count', column)]] for agg in aggs if column in agg['sum'].columns]
+        if not aggs:
+            return pd.DataFrame()
+        total = pd.concat(aggs).groupby(level=['woche', 'sorte']).sum()
+        mean = total[('sum', column)] / total[('count', column)].where(total[('count', column)] > 0)
+        return mean.unstack('sorte').sort_index()
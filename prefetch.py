@@ -0,0 +1,84 @@
+# prefetch.py
+#
+# Hintergrund-Vorberechnung von wahrscheinlichen Folge-Auswahlen.
+# Nach dem Rendern einer Seite werden die Aggregate und Figuren benachbarter
+# Auswahlen (z.B. die anderen Häuser einer Kultur) in einem Thread-Pool
+# berechnet und in einem gemeinsamen Cache abgelegt. Wechselt der Nutzer die
+# Auswahl, werden noch nicht gestartete Aufgaben verworfen.
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    def __init__(self, max_workers=2, budget=6, max_entries=128):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._pending = {}
+        self.budget = budget
+        self.max_entries = max_entries
+
+    def _store(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            # Älteste Einträge verwerfen (LRU)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _run(self, key, fn):
+        try:
+            value = fn()
+            self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get_or_compute(self, key, fn):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            future = self._inflight.get(key)
+
+        # Läuft die Berechnung bereits im Hintergrund, auf das Ergebnis warten,
+        # sonst (noch in der Warteschlange) verwerfen und selbst rechnen
+        if future is not None:
+            if future.cancel():
+                with self._lock:
+                    self._inflight.pop(key, None)
+            else:
+                try:
+                    return future.result()
+                except Exception:
+                    pass
+
+        value = fn()
+        self._store(key, value)
+        return value
+
+    def schedule(self, owner, tasks):
+        # tasks: Iterable aus (key, fn). Höchstens `budget` neue Aufgaben pro Aufruf.
+        self.cancel(owner)
+        futures = []
+        with self._lock:
+            for key, fn in tasks:
+                if len(futures) >= self.budget:
+                    break
+                if key in self._cache or key in self._inflight:
+                    continue
+                future = self._executor.submit(self._run, key, fn)
+                self._inflight[key] = future
+                futures.append((key, future))
+            self._pending[owner] = futures
+
+    def cancel(self, owner):
+        with self._lock:
+            futures = self._pending.pop(owner, [])
+            for key, future in futures:
+                if future.cancel():
+                    self._inflight.pop(key, None)
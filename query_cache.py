@@ -0,0 +1,111 @@
+# query_cache.py
+#
+# Cache für Abfrage-Ergebnisse, der sich an der Datenversion der Tabellen
+# orientiert statt nur am SQL-Text.
+#
+# Pro Tabelle wird eine günstige Version abgefragt (max(ID) über den
+# Primärschlüssel-Index, alle Tabellen in einer Abfrage). Die Probe läuft
+# höchstens alle `probe_interval` Sekunden. Ein Ergebnis wird nur neu geladen,
+# wenn sich eine der Tabellen geändert hat, die in der Abfrage vorkommen. Der
+# Cache ist auf `max_entries` Einträge begrenzt (LRU).
+#
+# Abfragen ohne bekannte Tabelle haben keine Version und verfallen deshalb
+# nach `probe_interval` Sekunden.
+#
+# Gelöschte Zeilen werden von max(ID) nicht erkannt; dafür bräuchte es eine
+# von einem Trigger gepflegte Änderungs-Spalte.
+#
+# Ergebnisse werden als Kopie ausgegeben, damit eine Session den Cache der
+# anderen nicht verändern kann.
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Tabelle -> ID-Spalte für die Versions-Probe
+TRACKED_TABLES = {
+    'klima_messungen': 'klima_id',
+    'wachstum_messungen': 'wachstum_id',
+    'produktion_messungen': 'produktion_id',
+    'pflanzen': 'pflanze_id',
+}
+
+
+def version_probe_sql(tables=TRACKED_TABLES):
+    return "\nUNION ALL\n".join(
+        f"SELECT '{table}' AS tabelle, max({id_col})::text AS version FROM {table}"
+        for table, id_col in tables.items()
+    )
+
+
+def tables_in(query, tables=TRACKED_TABLES):
+    return tuple(sorted(t for t in tables if re.search(rf'\b{re.escape(t)}\b', query, re.IGNORECASE)))
+
+
+class VersionedQueryCache:
+    def __init__(self, fetch, probe, max_entries=64, probe_interval=30.0):
+        # fetch: Funktion(sql) -> DataFrame
+        # probe: Funktion() -> {tabelle: version}
+        self._fetch = fetch
+        self._probe = probe
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # None, solange noch keine Probe erfolgreich war -> dann wird nicht gecacht
+        self._versions = None
+        self._probed_at = None
+        self.max_entries = max_entries
+        self.probe_interval = probe_interval
+
+    def versions(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._probed_at is not None and now - self._probed_at < self.probe_interval:
+                return self._versions
+            # Probe für diesen Intervall reservieren; andere Sessions nutzen solange die alten Versionen
+            self._probed_at = now
+
+        # Netzwerk-Aufruf ausserhalb des Locks, damit Cache-Treffer nicht warten müssen
+        try:
+            versions = self._probe()
+        except Exception:
+            logger.warning("Versions-Probe fehlgeschlagen, verwende letzte bekannte Versionen", exc_info=True)
+            with self._lock:
+                return self._versions
+
+        with self._lock:
+            self._versions = versions
+            return versions
+
+    def get(self, query):
+        versions = self.versions()
+        if versions is None:
+            # Noch keine Datenversion bekannt -> nicht cachen
+            return self._fetch(query)
+        key = tuple((t, versions.get(t)) for t in tables_in(query))
+
+        with self._lock:
+            entry = self._entries.get(query)
+            # Ohne Tabellen-Version (key leer) gilt ein Eintrag nur für probe_interval Sekunden
+            fresh = entry is not None and (key or time.monotonic() - entry[2] < self.probe_interval)
+            if fresh and entry[0] == key:
+                self._entries.move_to_end(query)
+                return entry[1].copy()
+
+        df = self._fetch(query)
+
+        with self._lock:
+            self._entries[query] = (key, df, time.monotonic())
+            self._entries.move_to_end(query)
+            # Älteste Einträge verwerfen (LRU)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return df.copy()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._probed_at = None
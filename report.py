@@ -0,0 +1,239 @@
+# report.py
+#
+# Headless Report-Renderer für die wöchentliche Besprechung.
+# Rendert alle Plots für jede Kultur × Haus × Sorte-Kombination als statisches
+# HTML-Bundle (optional zusätzlich PNG, benötigt `kaleido`).
+#
+#   python report.py --out report --workers 4 [--png] [--force]
+#
+# Die Daten werden einmal geladen und an die Worker-Prozesse übergeben.
+# Kombinationen, deren Eingangsdaten sich seit dem letzten Lauf nicht geändert
+# haben, werden übersprungen (Fingerprints in <out>/manifest.json).
+
+import argparse
+import hashlib
+import html
+import json
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+import plotly.offline
+
+from analysis import (
+    read_measurements,
+    compute_temperaturvergleich, build_temperatur_figure,
+    compute_lai_fruchtansatz, build_lai_fruchtansatz_figure,
+    compute_wachstumsmotor, build_wachstumsmotor_figure,
+    compute_sortenvergleich, build_sortenvergleich_figure,
+)
+
+BASE_DIR = Path(__file__).parent
+
+# Bei Änderungen am Layout der Seiten hochzählen, damit alles neu gerendert wird
+RENDER_VERSION = 1
+
+# Platzhalter für Pflanzen ohne Sorte (z.B. Aubergine)
+OHNE_SORTE = "ohne Sorte"
+
+# Von den Workern gemeinsam genutzte Daten (per Initializer gesetzt)
+_DATA = {}
+
+
+def load_tables(base_dir=BASE_DIR):
+    return {
+        'pflanzen': read_measurements(base_dir / 'pflanzen.csv'),
+        'klima': read_measurements(base_dir / 'klima_messungen.csv'),
+        'wachstum': read_measurements(base_dir / 'wachstum_messungen.csv'),
+        'produktion': read_measurements(base_dir / 'produktion_messungen.csv'),
+    }
+
+
+def _init_worker(data):
+    _DATA.update(data)
+
+
+def _label(value):
+    return OHNE_SORTE if pd.isna(value) else str(value)
+
+
+def _slug(value):
+    return re.sub(r'[^A-Za-z0-9]+', '_', _label(value)).strip('_').lower()
+
+
+def _title(params):
+    return " · ".join(_label(v) for v in params.values())
+
+
+def _fingerprint(*frames):
+    h = hashlib.sha1(str(RENDER_VERSION).encode())
+    for df in frames:
+        h.update(str(list(df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+# --- JOBS ---
+def plan_jobs(data):
+    # Liefert (job_id, art, parameter, fingerprint) für alle Kombinationen
+    pflanzen = data['pflanzen']
+    klima, wachstum, produktion = data['klima'], data['wachstum'], data['produktion']
+    jobs = []
+
+    for kultur, pflanzen_kultur in pflanzen.groupby('kultur'):
+        ids = pflanzen_kultur['pflanze_id'].unique()
+        jobs.append((
+            f"{_slug(kultur)}/index",
+            'kultur',
+            {'kultur': kultur},
+            _fingerprint(
+                pflanzen_kultur,
+                wachstum[wachstum['pflanze_id'].isin(ids)],
+                produktion[produktion['pflanze_id'].isin(ids)],
+            ),
+        ))
+
+        # dropna=False: auch Pflanzen ohne Sorte bekommen eine Seite
+        for (haus, sorte), pflanzen_combo in pflanzen_kultur.groupby(['haus', 'sorte'], dropna=False):
+            sorte = None if pd.isna(sorte) else sorte
+            ids = pflanzen_combo['pflanze_id'].unique()
+            jobs.append((
+                f"{_slug(kultur)}/haus_{_slug(haus)}__{_slug(sorte)}",
+                'kombination',
+                {'kultur': kultur, 'haus': haus, 'sorte': sorte},
+                _fingerprint(
+                    pflanzen_combo,
+                    klima[klima['haus'] == haus],
+                    wachstum[wachstum['haus'] == haus],
+                    produktion[produktion['pflanze_id'].isin(ids)],
+                ),
+            ))
+    return jobs
+
+
+def _figures_for(art, params):
+    pflanzen = _DATA['pflanzen']
+    klima, wachstum, produktion = _DATA['klima'], _DATA['wachstum'], _DATA['produktion']
+    kultur = params['kultur']
+
+    if art == 'kultur':
+        ids = pflanzen.loc[pflanzen['kultur'] == kultur, 'pflanze_id'].unique()
+        return [
+            ('sortenvergleich', build_sortenvergleich_figure(compute_sortenvergleich(produktion, pflanzen, kultur))),
+            ('lai_fruchtansatz', build_lai_fruchtansatz_figure(
+                compute_lai_fruchtansatz(wachstum, produktion, ids), kultur)),
+        ]
+
+    haus, sorte = params['haus'], params['sorte']
+    sorte_mask = pflanzen['sorte'].isna() if sorte is None else pflanzen['sorte'] == sorte
+    ids = pflanzen.loc[(pflanzen['kultur'] == kultur) & (pflanzen['haus'] == haus) & sorte_mask, 'pflanze_id'].unique()
+    return [
+        ('temperatur', build_temperatur_figure(
+            compute_temperaturvergleich(klima, haus), title=f"Innen- vs. Aussentemperatur (Haus {haus})")),
+        ('wachstumsmotor', build_wachstumsmotor_figure(
+            compute_wachstumsmotor(klima, wachstum, haus), kultur, haus)),
+        ('lai_fruchtansatz', build_lai_fruchtansatz_figure(
+            compute_lai_fruchtansatz(wachstum, produktion, ids), f"{kultur}, Haus {haus}, {_label(sorte)}")),
+    ]
+
+
+def _page(title, figures, plotlyjs_src):
+    body = "\n".join(fig.to_html(full_html=False, include_plotlyjs=False) for _, fig in figures)
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title>"
+        f"<script src=\"{plotlyjs_src}\"></script></head>\n"
+        f"<body><h1>{html.escape(title)}</h1>\n{body}\n</body></html>\n"
+    )
+
+
+def render_job(job_id, art, params, out_dir, png=False):
+    start = time.perf_counter()
+    figures = _figures_for(art, params)
+
+    target = Path(out_dir) / f"{job_id}.html"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(_page(_title(params), figures, "../plotly.min.js"), encoding="utf-8")
+
+    if png:
+        for name, fig in figures:
+            fig.write_image(target.with_name(f"{target.stem}__{name}.png"))
+
+    return job_id, time.perf_counter() - start
+
+
+def _write_index(out_dir, jobs):
+    links = "\n".join(
+        f"<li><a href=\"{html.escape(job_id)}.html\">{html.escape(_title(params))}</a></li>"
+        for job_id, _, params, _ in jobs
+    )
+    (out_dir / "index.html").write_text(
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Gewächshaus-Report</title></head>\n"
+        f"<body><h1>Gewächshaus-Report</h1><ul>\n{links}\n</ul></body></html>\n",
+        encoding="utf-8",
+    )
+
+
+def build_report(out_dir, workers=None, png=False, force=False, base_dir=BASE_DIR):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    data = load_tables(base_dir)
+    jobs = plan_jobs(data)
+
+    manifest_path = out_dir / "manifest.json"
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    manifest = {} if force else dict(previous)
+
+    todo = [
+        job for job in jobs
+        if force or manifest.get(job[0]) != job[3] or not (out_dir / f"{job[0]}.html").exists()
+    ]
+
+    plotlyjs = out_dir / "plotly.min.js"
+    if not plotlyjs.exists():
+        plotlyjs.write_text(plotly.offline.get_plotlyjs(), encoding="utf-8")
+
+    rendered = {}
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            futures = {
+                pool.submit(render_job, job_id, art, params, out_dir, png): (job_id, fingerprint)
+                for job_id, art, params, fingerprint in todo
+            }
+            for future in as_completed(futures):
+                job_id, fingerprint = futures[future]
+                _, dauer = future.result()
+                rendered[job_id] = dauer
+                manifest[job_id] = fingerprint
+                print(f"  {job_id} ({dauer:.2f}s)")
+
+    # Nur noch existierende Kombinationen im Manifest behalten, Seiten weggefallener löschen
+    manifest = {job[0]: manifest[job[0]] for job in jobs if job[0] in manifest}
+    for job_id in set(previous) - {job[0] for job in jobs}:
+        target = out_dir / f"{job_id}.html"
+        for path in [target, *target.parent.glob(f"{target.stem}__*.png")]:
+            path.unlink(missing_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    _write_index(out_dir, jobs)
+
+    return len(rendered), len(jobs) - len(rendered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendert alle Plots für alle Kulturen, Häuser und Sorten.")
+    parser.add_argument("--out", default="report", help="Zielordner für das Report-Bundle")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Worker-Prozesse (Standard: CPU-Anzahl)")
+    parser.add_argument("--png", action="store_true", help="Zusätzlich PNG-Dateien schreiben (benötigt kaleido)")
+    parser.add_argument("--force", action="store_true", help="Alle Kombinationen neu rendern")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    neu, uebersprungen = build_report(args.out, workers=args.workers, png=args.png, force=args.force)
+    print(f"{neu} Seiten gerendert, {uebersprungen} unverändert übersprungen ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# truss_store.py
+#
+# Normalisierte Truss-Ebene für produktion_messungen.
+# Die Tabelle enthält pro Kennzahl sechs Spalten (obere Truss, minus1..minus5),
+# die grösstenteils leer sind. Der Store hält stattdessen
+#   - `base`:  alle übrigen Spalten mit kompakten Dtypes
+#   - `long`:  eine Zeile pro (Messung, Kennzahl, Truss-Offset) mit Wert
+# und baut das breite Layout nur bei Bedarf wieder auf. `long` referenziert die
+# Messung nur über produktion_id; pflanze_id/datum kommen bei Bedarf aus `base`.
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Kennzahl -> (Spalten-Präfix, Spalte mit der Nummer der oberen Truss)
+TRUSS_METRICS = {
+    'blueten': ('blueten_auf_der_oberen_truss', 'truss_nr_bluehende_obere_truss'),
+    'gesetzte_fruechte': ('gesetzten_fruechte_auf_der_oberen_truss', 'truss_nr_gesetzte_fruechte_obere_truss'),
+    'geerntete_fruechte': ('geernteten_fruechte_auf_der_oberen_truss', 'truss_nr_ernte_fruechte_obere_truss'),
+}
+
+LONG_COLS = ['produktion_id', 'metric', 'truss_offset', 'truss_nr', 'value']
+
+
+def _truss_column(prefix, offset):
+    return prefix if offset == 0 else f"{prefix}_minus{offset}"
+
+
+def _parse_truss_column(col):
+    for metric, (prefix, _) in TRUSS_METRICS.items():
+        m = re.fullmatch(re.escape(prefix) + r'(?:_minus(\d+))?', col)
+        if m:
+            return metric, int(m.group(1) or 0)
+    return None
+
+
+def _compact(df):
+    # Ganzzahlen und Fliesskommazahlen auf den kleinsten passenden Typ bringen
+    df = df.copy()
+    for col in df.select_dtypes(include=['integer']).columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes(include=['floating']).columns:
+        df[col] = df[col].astype('float32')
+    return df
+
+
+class TrussStore:
+    def __init__(self, base, long, columns):
+        self.base = base
+        self.long = long
+        self.columns = columns
+
+    @classmethod
+    def from_wide(cls, df_produktion):
+        truss_cols = {col: parsed for col in df_produktion.columns if (parsed := _parse_truss_column(col))}
+        base = _compact(df_produktion.drop(columns=list(truss_cols)))
+
+        parts = []
+        ids = df_produktion['produktion_id'].to_numpy()
+        for col, (metric, offset) in truss_cols.items():
+            values = df_produktion[col]
+            mask = values.notna().to_numpy()
+            if not mask.any():
+                continue
+            # Absolute Truss-Nummer = Nummer der oberen Truss minus Offset
+            truss_nr = df_produktion[TRUSS_METRICS[metric][1]].to_numpy()[mask] - offset
+            parts.append(pd.DataFrame({
+                'produktion_id': ids[mask],
+                'metric': metric,
+                'truss_offset': offset,
+                'truss_nr': np.where(truss_nr > 0, truss_nr, np.nan),
+                'value': values.to_numpy()[mask],
+            }))
+
+        if parts:
+            long = pd.concat(parts, ignore_index=True)
+        else:
+            long = pd.DataFrame(columns=LONG_COLS)
+
+        long = long.astype({
+            'produktion_id': 'int32',
+            'truss_offset': 'int8',
+            'truss_nr': 'Int16',
+            'value': 'float32',
+        })
+        long['metric'] = pd.Categorical(long['metric'], categories=list(TRUSS_METRICS))
+        return cls(base, long, list(df_produktion.columns))
+
+    @property
+    def truss_columns(self):
+        return [col for col in self.columns if _parse_truss_column(col)]
+
+    def wide(self, columns=None):
+        # Breites Layout wie in produktion_messungen.csv wiederherstellen.
+        # Mit `columns` nur produktion_id plus diese Truss-Spalten (z.B. für einzelne Plots)
+        long = self.long
+        if columns is not None:
+            mask = np.zeros(len(long), dtype=bool)
+            for metric, offset in {_parse_truss_column(col) for col in columns} - {None}:
+                mask |= ((long['metric'] == metric) & (long['truss_offset'] == offset)).to_numpy()
+            long = long[mask]
+
+        pivot = long.pivot_table(
+            index='produktion_id', columns=['metric', 'truss_offset'], values='value',
+            aggfunc='first', observed=True
+        )
+        pivot.columns = [_truss_column(TRUSS_METRICS[metric][0], offset) for metric, offset in pivot.columns]
+
+        target_columns = self.columns if columns is None else ['produktion_id'] + [c for c in columns if _parse_truss_column(c)]
+        base = self.base if columns is None else self.base[['produktion_id']]
+        wide = base.join(pivot, on='produktion_id')
+        for col in target_columns:
+            if col not in wide.columns:
+                wide[col] = np.float32(np.nan)
+        return wide[target_columns]
+
+    def memory_usage(self):
+        return int(self.base.memory_usage(deep=True).sum() + self.long.memory_usage(deep=True).sum())
+
+    # --- TRUSS-ANALYSEN ---
+    def first_seen(self, metric):
+        # Erstes Datum, an dem eine Truss für die Kennzahl einen Wert > 0 hatte
+        rows = self.long[(self.long['metric'] == metric) & (self.long['value'] > 0) & self.long['truss_nr'].notna()]
+        rows = rows.merge(self.base[['produktion_id', 'pflanze_id', 'pflanze_nr', 'datum']], on='produktion_id')
+        return rows.groupby(['pflanze_id', 'pflanze_nr', 'truss_nr'])['datum'].min()
+
+    def blossom_to_harvest(self):
+        bluete = self.first_seen('blueten').rename('bluete_datum')
+        ernte = self.first_seen('geerntete_fruechte').rename('ernte_datum')
+        df = pd.concat([bluete, ernte], axis=1, join='inner').reset_index()
+        df['tage_bis_ernte'] = (df['ernte_datum'] - df['bluete_datum']).dt.days
+        return df[df['tage_bis_ernte'] >= 0]
@@ -0,0 +1,89 @@
+# wire_format.py
+#
+# Übertragungsformate für Abfrage-Ergebnisse aus Supabase (RPC `execute_sql`).
+#
+# "rows":     Standard. Eine Liste von JSON-Objekten, ein Objekt pro Zeile; die
+#             Spaltennamen werden in jeder Zeile wiederholt.
+# "columnar": Die Abfrage wird in der Datenbank so umgeschrieben, dass sie ein
+#             einziges JSON-Objekt {spalte: [werte...]} liefert. Das spart die
+#             wiederholten Schlüssel auf der Leitung und wird direkt spaltenweise
+#             in ein DataFrame dekodiert.
+#
+# Lässt sich die umgeschriebene Abfrage nicht ausführen (SQL-Fehler) oder nicht
+# dekodieren, wird auf "rows" zurückgefallen. Netzwerk-, Auth- und andere
+# Fehler werden dagegen direkt weitergereicht.
+
+import json
+import logging
+
+import pandas as pd
+
+WIRE_FORMATS = ("columnar", "rows")
+COLUMNS_KEY = "columns"
+
+logger = logging.getLogger(__name__)
+
+
+def columnar_sql(query):
+    # Reihenfolge der Zeilen (row_number über die Original-Abfrage) und der
+    # Spalten (Ordinalität in json_each) bleibt erhalten.
+    query = query.strip().rstrip(";")
+    return f"""
+        WITH _rows AS (
+            SELECT row_number() OVER () AS _pos, row_to_json(_q) AS _r
+            FROM ({query}) _q
+        )
+        SELECT json_object_agg(_key, _vals ORDER BY _col) AS "{COLUMNS_KEY}"
+        FROM (
+            SELECT e.key AS _key, min(e.ord) AS _col, json_agg(e.value ORDER BY _rows._pos) AS _vals
+            FROM _rows, json_each(_rows._r) WITH ORDINALITY AS e(key, value, ord)
+            GROUP BY e.key
+        ) _c
+    """
+
+
+def decode_rows(data):
+    return pd.DataFrame(data)
+
+
+def decode_columnar(data):
+    # `data` ist entweder das Objekt selbst oder die RPC-Antwort [{"columns": {...}}]
+    if isinstance(data, (bytes, str)):
+        data = json.loads(data)
+    if isinstance(data, list):
+        if len(data) != 1 or not isinstance(data[0], dict) or COLUMNS_KEY not in data[0]:
+            raise ValueError("Unerwartete Antwort für spaltenweise Übertragung")
+        data = data[0][COLUMNS_KEY]
+    elif isinstance(data, dict) and COLUMNS_KEY in data:
+        data = data[COLUMNS_KEY]
+
+    # Leeres Ergebnis: json_object_agg über null Zeilen liefert NULL
+    if data is None:
+        return pd.DataFrame()
+    if not isinstance(data, dict):
+        raise ValueError("Unerwartete Antwort für spaltenweise Übertragung")
+
+    # Jede Spalte wird einzeln typisiert (int/float/str), statt Zeile für Zeile
+    return pd.DataFrame({col: pd.Series(values) for col, values in data.items()})
+
+
+def fetch_dataframe(execute, query, wire_format="columnar", is_sql_error=None):
+    # execute: Funktion(sql) -> JSON-Daten der RPC-Antwort
+    # is_sql_error: Funktion(exception) -> True, wenn die Datenbank die Abfrage abgelehnt hat
+    if wire_format not in WIRE_FORMATS:
+        raise ValueError(f"Unbekanntes Übertragungsformat: {wire_format}")
+
+    if wire_format == "columnar":
+        try:
+            data = execute(columnar_sql(query))
+        except Exception as e:
+            # z.B. Abfrage lässt sich nicht einbetten (mehrere Statements) -> normaler Weg
+            if is_sql_error is None or not is_sql_error(e):
+                raise
+            logger.warning("Spaltenweise Abfrage abgelehnt, falle auf Zeilen zurück: %s", e)
+        else:
+            try:
+                return decode_columnar(data)
+            except (ValueError, TypeError) as e:
+                logger.warning("Spaltenweise Antwort nicht lesbar, falle auf Zeilen zurück: %s", e)
+    return decode_rows(execute(query))